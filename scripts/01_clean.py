@@ -9,14 +9,18 @@ We keep 24 columns describing actual match events and derive 5 more.
 Run: python scripts/01_clean.py
 """
 
+import io
 import os
 import sys
-from datetime import datetime
+import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 try:
     import pandas as pd
+    import numpy as np
 except ImportError:
     print("ERROR: pandas is required. Run: pip install pandas")
     sys.exit(1)
@@ -32,6 +36,19 @@ from config import (
     FOOTBALL_DATA_URL, FOOTBALL_DATA_NAME_MAP,
 )
 
+# pyarrow's CSV reader tokenizes blocks in parallel native threads and is
+# noticeably faster on the wide raw files. Optional -- the single-threaded
+# C engine handles everything when pyarrow is not installed.
+try:
+    import pyarrow
+    CSV_ENGINE = 'pyarrow'
+    # Arrow-backed strings dispatch .str operations (strip etc.) to
+    # Arrow's native UTF-8 kernels instead of a Python loop per row
+    STRING_DTYPE = 'string[pyarrow]'
+except ImportError:
+    CSV_ENGINE = 'c'
+    STRING_DTYPE = 'string'
+
 # -- PATHS -----------------------------------------------------------------
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 RAW_DIR = os.path.join(BASE_DIR, 'data', 'raw')
@@ -78,57 +95,134 @@ STAT_COLS = [
 
 GOAL_COLS = ['FTHG', 'FTAG']
 
+# Match results are a fixed three-value field. Declaring the categories
+# explicitly (rather than plain 'category') guarantees every per-season
+# file gets identical categories, so concat keeps the int8-coded dtype
+# instead of falling back to object when a file happens to miss a value.
+RESULT_DTYPE = pd.CategoricalDtype(['H', 'D', 'A'])
+
+# -- READ DTYPES -----------------------------------------------------------
+# Declaring dtypes up front lets the parser write straight into typed
+# buffers instead of inferring per file. Stat columns are nullable Int16
+# because some seasons miss a column entirely (filled later); results are
+# three-value fields, so category.
+READ_DTYPES = {
+    'Date': STRING_DTYPE, 'Time': STRING_DTYPE,
+    'HomeTeam': STRING_DTYPE, 'AwayTeam': STRING_DTYPE,
+    'Referee': STRING_DTYPE,
+    'FTR': RESULT_DTYPE, 'HTR': RESULT_DTYPE,
+    **{c: 'Int16' for c in STAT_COLS},
+}
+
+# Post-fill integer widths. Once nulls are handled the NA mask is dead
+# weight; plain int8/int16 is plenty (goals and cards are single digits,
+# shots/fouls/corners stay under a few dozen).
+STAT_DTYPES = {
+    'FTHG': 'int8', 'FTAG': 'int8', 'HTHG': 'int8', 'HTAG': 'int8',
+    'HY': 'int8', 'AY': 'int8', 'HR': 'int8', 'AR': 'int8',
+    'HS': 'int16', 'AS': 'int16', 'HST': 'int16', 'AST': 'int16',
+    'HF': 'int16', 'AF': 'int16', 'HC': 'int16', 'AC': 'int16',
+}
+
+
+def _read_meta(filepath):
+    """Load the cached ETag/Last-Modified headers for a downloaded file."""
+    try:
+        with open(filepath + '.meta.json', 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_meta(filepath, response):
+    """Store validator headers so the next run can send a conditional GET."""
+    meta = {k: response.headers.get(k) for k in ('ETag', 'Last-Modified')}
+    if any(meta.values()):
+        with open(filepath + '.meta.json', 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+
+def parse_date_column(dates):
+    """Parse one file's Date column (DD/MM/YYYY or DD/MM/YY) to datetime.
+
+    The format is constant within a source file, so sniff it from the
+    first value and hand pd.to_datetime a single explicit format. That
+    selects the fast C parsing path, and cache=True parses each distinct
+    matchday date once -- every date repeats ~10 times (one per fixture).
+    """
+    dates = dates.astype(STRING_DTYPE).str.strip()
+    # Sniff from the first few rows rather than a single value so one
+    # malformed leading row cannot flip the format and NaT-out the file.
+    sample = dates.dropna().head(5)
+    four_digit_year = any(len(str(v).split('/')[-1]) == 4 for v in sample)
+    fmt = '%d/%m/%Y' if four_digit_year else '%d/%m/%y'
+    return pd.to_datetime(dates, format=fmt, errors='coerce', cache=True)
+
 
 def download_if_missing(filepath, url):
-    """Download source file if not already cached locally."""
+    """Download source file if not already cached locally.
+
+    Returns the downloaded bytes on a fresh fetch (so the caller can
+    parse them without re-reading the file just written) or None when
+    the local cache is used.
+    """
     if os.path.exists(filepath):
         print(f"  Using cached: {os.path.basename(filepath)}")
-        return
+        return None
     print(f"  Downloading: {url}")
     try:
         response = requests.get(url, timeout=30)
         response.raise_for_status()
         with open(filepath, 'wb') as f:
             f.write(response.content)
+        _write_meta(filepath, response)
+        return response.content
     except requests.exceptions.RequestException as e:
         print(f"  WARNING: Could not download {url} -- {e}")
         raise
 
 
 def download_current(filepath, url):
-    """Always re-download for live season (CSV grows weekly)."""
+    """Re-check the live season each run (CSV grows weekly).
+
+    Sends a conditional GET with the ETag/Last-Modified saved from the
+    previous download -- a 304 Not Modified costs a few header bytes
+    instead of re-transferring the whole growing CSV. Returns the fresh
+    bytes on a 200, None on a 304 (parse the cached file instead).
+    """
+    headers = {}
+    if os.path.exists(filepath):
+        meta = _read_meta(filepath)
+        if meta.get('ETag'):
+            headers['If-None-Match'] = meta['ETag']
+        if meta.get('Last-Modified'):
+            headers['If-Modified-Since'] = meta['Last-Modified']
+
     print(f"  Downloading latest: {url}")
     try:
-        response = requests.get(url, timeout=30)
+        response = requests.get(url, headers=headers, timeout=30)
+        if response.status_code == 304:
+            print(f"  Not modified -- using cached: {os.path.basename(filepath)}")
+            return None
         response.raise_for_status()
         with open(filepath, 'wb') as f:
             f.write(response.content)
+        _write_meta(filepath, response)
+        return response.content
     except requests.exceptions.RequestException as e:
         print(f"  WARNING: Could not download {url} -- {e}")
         raise
 
 
-def parse_date(date_str):
-    """Standardize DD/MM/YYYY and DD/MM/YY to ISO 8601 (YYYY-MM-DD)."""
-    if pd.isna(date_str):
-        return None
-    date_str = str(date_str).strip()
-    for fmt in ['%d/%m/%Y', '%d/%m/%y']:
-        try:
-            return datetime.strptime(date_str, fmt).strftime('%Y-%m-%d')
-        except ValueError:
-            continue
-    return None
-
-
 def main():
     print("Loading raw match data...")
 
     # -- STEP 1: Download + Load -------------------------------------------
     # Each season is a separate CSV on football-data.co.uk. We download
-    # once and cache locally so development works offline.
-    frames = []
-    for season_label, season_info in ACTIVE_SEASONS.items():
+    # once and cache locally so development works offline. Downloads are
+    # independent and network-bound, so they run concurrently in a thread
+    # pool; parsing stays serial (fast, and keeps concat order stable).
+    def fetch(season_label, season_info):
         code = season_info["code"]
         url = FOOTBALL_DATA_URL.format(code=code)
         filepath = os.path.join(RAW_DIR, f'matches_{code}.csv')
@@ -137,38 +231,88 @@ def main():
         is_current = (season_label == CURRENT_SEASON
                       and season_info.get("fpl_mode") == "live")
         if is_current:
-            download_current(filepath, url)
+            content = download_current(filepath, url)
         else:
-            download_if_missing(filepath, url)
+            content = download_if_missing(filepath, url)
+        return filepath, content
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        downloads = {label: pool.submit(fetch, label, info)
+                     for label, info in ACTIVE_SEASONS.items()}
+    results = {label: future.result() for label, future in downloads.items()}
+
+    # -- CACHE CHECK -------------------------------------------------------
+    # If no raw file changed since the last successful run, the cleaned
+    # outputs are already current -- skip STEP 1-8 entirely. The signature
+    # hashes (name, mtime, size) per raw file; a 304 on the live season
+    # leaves its file untouched, so quiet weeks become a no-op run.
+    sig_source = sorted(
+        (os.path.basename(p), os.path.getmtime(p), os.path.getsize(p))
+        for p, _ in results.values())
+    sig = hashlib.sha1(repr(sig_source).encode()).hexdigest()
+    sig_path = os.path.join(RAW_DIR, '.clean_sig')
+    output_path = os.path.join(CLEAN_DIR, 'matches_clean.csv')
+    try:
+        with open(sig_path, 'r', encoding='utf-8') as f:
+            previous_sig = f.read().strip()
+    except OSError:
+        previous_sig = ''
+    if sig == previous_sig and os.path.exists(output_path):
+        print("\nRaw files unchanged since last run -- cleaned output is current.")
+        return
 
-        # utf-8-sig strips the BOM that football-data.co.uk prepends
-        df = pd.read_csv(filepath, encoding='utf-8-sig')
-        df = df.assign(Season=season_label)
-        print(f"  {season_label}: {len(df)} matches, {len(df.columns)} columns")
+    frames = []
+    raw_columns = set()
+    for season_label, (filepath, content) in results.items():
+
+        # Freshly downloaded bytes are parsed straight from memory -- the
+        # file was just written for the cache, no need to read it back.
+        source = io.BytesIO(content) if content is not None else filepath
+
+        # utf-8-sig strips the BOM that football-data.co.uk prepends.
+        # usecols drops the ~96 betting columns inside the C parser, so
+        # odds values are never tokenized or materialized. A header-only
+        # read first keeps the raw column count for reporting.
+        keep = set(KEEP_COLUMNS)
+        header = pd.read_csv(source, encoding='utf-8-sig', nrows=0)
+        raw_columns.update(header.columns)
+        if content is not None:
+            source.seek(0)
+        # The pyarrow engine needs a concrete column list (no callables);
+        # the header read above tells us which kept columns this file has.
+        usecols = [c for c in header.columns if c in keep]
+        df = pd.read_csv(source, encoding='utf-8-sig', usecols=usecols,
+                         dtype=READ_DTYPES, engine=CSV_ENGINE)
+        df = df.assign(Season=season_label, Date=parse_date_column(df['Date']))
+        print(f"  {season_label}: {len(df)} matches, {len(header.columns)} columns")
         frames.append(df)
 
     df = pd.concat(frames, ignore_index=True)
-    total_raw_cols = len(df.columns)
+    # Release the per-season frames immediately -- after concat they are a
+    # second full copy of every column and would stay alive for the rest
+    # of the pipeline otherwise.
+    frames.clear()
+    total_raw_cols = len(raw_columns)
     print(f"\nTotal raw records: {len(df)}")
     print(f"Total raw columns: {total_raw_cols}")
 
-    # -- STEP 2: Drop Irrelevant Columns -----------------------------------
+    # -- STEP 2: Report Dropped Columns ------------------------------------
     # ~96 columns are betting odds from various bookmakers. They add noise
-    # and are irrelevant to match performance analysis.
-    available = [c for c in KEEP_COLUMNS if c in df.columns]
+    # and are irrelevant to match performance analysis. The actual drop
+    # happens at read time via usecols; this step just reports it.
     missing = [c for c in KEEP_COLUMNS if c not in df.columns]
     if missing:
         print(f"  Note: columns not in all files (filled later): {missing}")
 
-    df = df[available + ['Season']]
-    dropped = total_raw_cols - len(df.columns)
+    dropped = total_raw_cols - (len(df.columns) - 1)  # -1 for added Season
     print(f"\nDropped {dropped} betting/odds columns")
     print(f"Keeping {len(df.columns)} columns")
 
     # -- STEP 3: Fix Date Formats ------------------------------------------
-    # Some files use DD/MM/YYYY, others DD/MM/YY. Standardize to ISO 8601
-    # so sorting and grouping by date work correctly.
-    df['Date'] = df['Date'].apply(parse_date)
+    # Dates were parsed per file at load time (see parse_date_column), so
+    # the concat arrives as datetime64. Keep the native dtype through the
+    # pipeline (date comparisons stay int64 under the hood); the ISO 8601
+    # string conversion happens once at save time. Drop unparseable rows.
     date_nulls = df['Date'].isna().sum()
     if date_nulls > 0:
         print(f"\n  WARNING: {date_nulls} dates could not be parsed -- dropping those rows")
@@ -179,10 +323,15 @@ def main():
     # -- STEP 4: Standardize Team Names ------------------------------------
     # football-data.co.uk uses abbreviations ("Man United", "Wolves") that
     # break merges with FPL and Understat. Map to canonical full names.
-    df['HomeTeam'] = df['HomeTeam'].replace(FOOTBALL_DATA_NAME_MAP)
-    df['AwayTeam'] = df['AwayTeam'].replace(FOOTBALL_DATA_NAME_MAP)
-
-    all_teams = sorted(set(df['HomeTeam'].unique()) | set(df['AwayTeam'].unique()))
+    # map + fillna is a plain hash lookup per value; replace routes through
+    # pandas' generic regex/list/dict machinery and is much slower.
+    df['HomeTeam'] = df['HomeTeam'].map(FOOTBALL_DATA_NAME_MAP).fillna(df['HomeTeam'])
+    df['AwayTeam'] = df['AwayTeam'].map(FOOTBALL_DATA_NAME_MAP).fillna(df['AwayTeam'])
+
+    # One hashed dedup pass over the stacked columns instead of two
+    # Python-set unions over string objects
+    all_teams = sorted(pd.unique(
+        pd.concat([df['HomeTeam'], df['AwayTeam']], ignore_index=True)).tolist())
     print(f"\nTeams found across all seasons: {len(all_teams)}")
     for t in all_teams:
         print(f"  - {t}")
@@ -190,20 +339,20 @@ def main():
     # -- STEP 5: Handle Nulls in Stat Columns ------------------------------
     # Goals cannot be imputed -- a null goal column means bad data.
     # Peripheral stats (corners, cards) null likely means "not recorded".
-    for col in GOAL_COLS:
-        if col in df.columns:
-            nulls = df[col].isna().sum()
-            if nulls > 0:
-                print(f"\n  Dropping {nulls} rows with null {col}")
-                df = df.dropna(subset=[col])
+    # One isna scan and one fillna over the sub-frame replaces the old
+    # per-column loop that touched each column three times.
+    goal_cols = [c for c in GOAL_COLS if c in df.columns]
+    goal_nulls = df[goal_cols].isna().sum()
+    for col, n in goal_nulls[goal_nulls > 0].items():
+        print(f"\n  Dropping {n} rows with null {col}")
+    if (goal_nulls > 0).any():
+        df = df.dropna(subset=goal_cols)
 
     peripheral = [c for c in STAT_COLS if c not in GOAL_COLS and c in df.columns]
-    null_counts = {}
-    for col in peripheral:
-        n = df[col].isna().sum()
-        if n > 0:
-            null_counts[col] = n
-            df[col] = df[col].fillna(0)
+    peripheral_nulls = df[peripheral].isna().sum()
+    null_counts = peripheral_nulls[peripheral_nulls > 0].to_dict()
+    if null_counts:
+        df[peripheral] = df[peripheral].fillna(0)
 
     print(f"\nNull check on match stats:")
     if null_counts:
@@ -212,10 +361,11 @@ def main():
     else:
         print("  No nulls found in stat columns")
 
-    # Convert stat columns to int after filling
-    for col in STAT_COLS:
+    # Every stat column is filled now -- downcast from nullable Int16 to
+    # the smallest plain integer width that holds the data.
+    for col, dtype in STAT_DTYPES.items():
         if col in df.columns:
-            df[col] = df[col].astype(int)
+            df[col] = df[col].astype(dtype)
 
     # -- STEP 6: Referee Cleanup -------------------------------------------
     # Trailing whitespace creates duplicate entries in aggregations
@@ -224,24 +374,39 @@ def main():
         unique_refs = df['Referee'].nunique()
         print(f"\nUnique referees: {unique_refs}")
 
-    # Fill missing Time values
+    # Fill missing Time values. Truncate to HH:MM -- the pyarrow engine
+    # parses kick-off times as a temporal type and renders them with
+    # seconds, so this keeps output identical across engines.
     if 'Time' in df.columns:
-        df['Time'] = df['Time'].fillna('').str.strip()
+        df['Time'] = df['Time'].fillna('').str.strip().str.slice(0, 5)
 
     # -- STEP 7: Rename Columns --------------------------------------------
     # Cryptic abbreviations hurt readability for portfolio reviewers.
     df = df.rename(columns=RENAME_MAP)
     df = df.rename(columns={'Season': 'season'})
 
+    # Teams, referees, results, and seasons all have tiny cardinalities
+    # (<50 distinct values). Category stores small int codes plus one
+    # dictionary instead of a Python string per row, which shrinks memory
+    # ~10x and makes groupby/unique on these columns run on int codes.
+    for col in ('home_team', 'away_team', 'referee', 'result', 'ht_result',
+                'season'):
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+
     # -- STEP 8: Add Derived Columns ---------------------------------------
     # These aggregations save repeated computation in the transform script
-    # and are the most commonly queried metrics in match analysis.
-    df['total_goals'] = df['home_goals'] + df['away_goals']
-    df['total_shots'] = df['home_shots'] + df['away_shots']
-    df['total_fouls'] = df['home_fouls'] + df['away_fouls']
-    df['total_cards'] = (df['home_yellows'] + df['away_yellows']
-                         + df['home_reds'] + df['away_reds'])
-    df['match_id'] = range(1, len(df) + 1)
+    # and are the most commonly queried metrics in match analysis. One
+    # assign call inserts all five columns in a single block-manager
+    # allocation instead of five incremental (fragmenting) insertions.
+    df = df.assign(
+        total_goals=df['home_goals'] + df['away_goals'],
+        total_shots=df['home_shots'] + df['away_shots'],
+        total_fouls=df['home_fouls'] + df['away_fouls'],
+        total_cards=(df['home_yellows'] + df['away_yellows']
+                     + df['home_reds'] + df['away_reds']),
+        match_id=np.arange(1, len(df) + 1, dtype=np.int32),
+    )
 
     # Reorder so match_id and season come first
     col_order = ['match_id', 'season', 'date', 'time',
@@ -259,9 +424,31 @@ def main():
     df = df[[c for c in col_order if c in df.columns]]
 
     # -- SAVE --------------------------------------------------------------
-    output_path = os.path.join(CLEAN_DIR, 'matches_clean.csv')
+    # Render dates as ISO 8601 text in one vectorized pass, only now that
+    # all date handling is done. Both output formats carry the strings so
+    # downstream consumers see identical values either way.
+    df['date'] = df['date'].dt.strftime('%Y-%m-%d')
+
     df.to_csv(output_path, index=False)
 
+    # Parquet preserves the dtype work done above (categoricals, small
+    # ints), so downstream reads skip type re-inference entirely. zstd
+    # level 3 is nearly free at write time and keeps the file a fraction
+    # of the CSV's size. The CSV itself stays uncompressed on purpose --
+    # it is the human-inspectable artifact and is diffed in git by the
+    # daily workflow. pyarrow is optional; the pipeline works CSV-only.
+    parquet_path = os.path.join(CLEAN_DIR, 'matches_clean.parquet')
+    try:
+        df.to_parquet(parquet_path, engine='pyarrow',
+                      compression='zstd', compression_level=3)
+        print(f"\nSaved: {parquet_path}")
+    except ImportError:
+        print("\npyarrow not installed -- skipping Parquet output")
+
+    # Record the raw-file signature only after a fully successful write
+    with open(sig_path, 'w', encoding='utf-8') as f:
+        f.write(sig)
+
     print(f"\nFinal cleaned dataset: {len(df)} matches, {len(df.columns)} columns")
     print(f"\nSaved: {output_path}")
     print("Cleaning complete.")
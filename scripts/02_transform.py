@@ -14,6 +14,7 @@ Run: python scripts/02_transform.py
 import os
 import sys
 import json
+import math
 import unicodedata
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -27,6 +28,21 @@ except ImportError:
 
 from config import ACTIVE_SEASONS, CURRENT_SEASON
 
+# pyarrow is optional: when available, CSV reads use its multithreaded
+# parser and Arrow-backed columns (compact strings, cheaper groupby keys).
+try:
+    import pyarrow  # noqa: F401
+    READ_CSV_KWARGS = {'engine': 'pyarrow', 'dtype_backend': 'pyarrow'}
+except ImportError:
+    READ_CSV_KWARGS = {}
+
+# orjson is optional too: a C serializer that understands numpy scalars
+# natively, several times faster than the stdlib json module.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # -- PATHS -----------------------------------------------------------------
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 CLEAN_DIR = os.path.join(BASE_DIR, 'data', 'cleaned')
@@ -34,6 +50,50 @@ OUTPUT_DIR = os.path.join(BASE_DIR, 'data')
 
 FULL_SEASON_MATCHES = 380
 
+# Columns each input file contributes to the output -- reads prune to
+# these so unused stats (corners, half-time detail, ...) are never parsed.
+MATCH_COLUMNS = [
+    'match_id', 'season', 'date', 'home_team', 'away_team', 'result',
+    'home_goals', 'away_goals', 'home_shots', 'away_shots',
+    'home_shots_on_target', 'away_shots_on_target', 'referee',
+    'home_reds', 'away_reds', 'total_goals', 'total_fouls', 'total_cards',
+]
+PLAYER_COLUMNS = [
+    'player_name', 'full_name', 'team', 'position', 'goals', 'assists',
+    'minutes', 'yellow_cards', 'red_cards', 'price',
+]
+XG_TEAM_COLUMNS = ['team', 'xg_for', 'xg_against', 'goals_for', 'goals_against']
+XG_PLAYER_COLUMNS = [
+    'player_name', 'team', 'position', 'minutes', 'goals', 'assists',
+    'xg', 'xa', 'shots', 'key_passes', 'npxg',
+]
+
+
+def read_csv_pruned(path, wanted, dtype=None):
+    """Read a CSV keeping only the wanted columns that actually exist."""
+    header = pd.read_csv(path, nrows=0)
+    cols = [c for c in header.columns if c in wanted]
+    kwargs = dict(READ_CSV_KWARGS)
+    if dtype:
+        kwargs['dtype'] = {k: v for k, v in dtype.items() if k in cols}
+    return pd.read_csv(path, usecols=cols, **kwargs)
+
+
+def read_enrichment(csv_path, wanted):
+    """Load an enrichment table, preferring its typed Parquet twin.
+
+    The fetch scripts write a .parquet next to each .csv when pyarrow is
+    available; reading it skips text parsing and type re-inference. The
+    CSV fallback keeps the pipeline working without pyarrow (or with
+    hand-edited CSVs). Raises FileNotFoundError when neither exists, so
+    callers keep their existing try/except handling.
+    """
+    parquet_path = csv_path[:-4] + '.parquet'
+    if os.path.exists(parquet_path):
+        frame = pd.read_parquet(parquet_path)
+        return frame[[c for c in frame.columns if c in wanted]]
+    return read_csv_pruned(csv_path, wanted)
+
 
 def safe_int(val):
     """Convert numpy int to Python int for JSON serialization."""
@@ -65,36 +125,77 @@ def safe_str(val):
     return str(val)
 
 
-def sanitize_for_json(obj):
-    """Recursively replace NaN/Infinity with JSON-safe values."""
-    if isinstance(obj, dict):
-        return {k: sanitize_for_json(v) for k, v in obj.items()}
-    if isinstance(obj, list):
-        return [sanitize_for_json(v) for v in obj]
-    if isinstance(obj, float):
-        if pd.isna(obj) or obj != obj:
-            return 0.0
-        if obj == float('inf') or obj == float('-inf'):
-            return 0.0
-        return obj
-    return obj
+class NumpyJSONEncoder(json.JSONEncoder):
+    """Serialize numpy scalars directly instead of pre-sanitizing the tree.
+
+    Python's json module writes literal NaN/Infinity which JS cannot parse,
+    so non-finite floats become 0.0 here -- the same policy the old
+    recursive sanitize pass applied, but in a single serialization pass
+    with no copy of the output tree.
+    """
+
+    def default(self, o):
+        if isinstance(o, np.integer):
+            return int(o)
+        if isinstance(o, np.floating):
+            val = float(o)
+            return val if math.isfinite(val) else 0.0
+        if isinstance(o, np.bool_):
+            return bool(o)
+        return str(o)
 
 
 def main():
     # -- LOAD REQUIRED DATA ------------------------------------------------
+    # Prefer Parquet when 01_clean.py produced it (typed columns, no
+    # re-inference); fall back to CSV so the pipeline works without pyarrow.
+    matches_parquet = os.path.join(CLEAN_DIR, 'matches_clean.parquet')
     matches_path = os.path.join(CLEAN_DIR, 'matches_clean.csv')
-    if not os.path.exists(matches_path):
+    players_path = os.path.join(CLEAN_DIR, 'players.csv')
+    xg_teams_path = os.path.join(CLEAN_DIR, 'xg_teams.csv')
+    xg_players_path = os.path.join(CLEAN_DIR, 'xg_players.csv')
+    output_path = os.path.join(OUTPUT_DIR, 'dashboard_data.json')
+    stamp_path = output_path + '.stamp'
+
+    # -- NO-OP FAST PATH ---------------------------------------------------
+    # If no input file changed since the last run, the existing output is
+    # already current -- skip the reparse and every aggregation.
+    input_paths = [matches_parquet, matches_path, players_path,
+                   xg_teams_path, xg_players_path]
+    # Parquet twins written by the fetch scripts count as inputs too
+    input_paths += [p[:-4] + '.parquet'
+                    for p in (players_path, xg_teams_path, xg_players_path)]
+    stamp = json.dumps(
+        {os.path.basename(p): (os.stat(p).st_mtime_ns, os.stat(p).st_size)
+         for p in input_paths if os.path.exists(p)},
+        sort_keys=True,
+    )
+    if os.path.exists(output_path):
+        try:
+            with open(stamp_path, encoding='utf-8') as f:
+                if f.read() == stamp:
+                    print("Inputs unchanged since last run -- dashboard_data.json is current.")
+                    return
+        except FileNotFoundError:
+            pass
+
+    if os.path.exists(matches_parquet):
+        df = pd.read_parquet(matches_parquet, columns=MATCH_COLUMNS)
+    elif os.path.exists(matches_path):
+        # date stays a string column: the pyarrow backend would otherwise
+        # infer the ISO dates as date32, which breaks the .str slicing
+        # (monthly trends) and string max below
+        df = read_csv_pruned(matches_path, MATCH_COLUMNS, dtype={'date': 'string'})
+    else:
         print("ERROR: matches_clean.csv not found. Run 01_clean.py first.")
         sys.exit(1)
-
-    df = pd.read_csv(matches_path)
     print(f"Loaded match data: {len(df)} rows")
 
     # -- LOAD OPTIONAL ENRICHMENT DATA -------------------------------------
     has_fpl = False
     players_df = None
     try:
-        players_df = pd.read_csv(os.path.join(CLEAN_DIR, 'players.csv'))
+        players_df = read_enrichment(players_path, PLAYER_COLUMNS)
         has_fpl = True
         print(f"Loaded FPL player data: {len(players_df)} rows")
     except FileNotFoundError:
@@ -104,8 +205,8 @@ def main():
     xg_teams_df = None
     xg_players_df = None
     try:
-        xg_teams_df = pd.read_csv(os.path.join(CLEAN_DIR, 'xg_teams.csv'))
-        xg_players_df = pd.read_csv(os.path.join(CLEAN_DIR, 'xg_players.csv'))
+        xg_teams_df = read_enrichment(xg_teams_path, XG_TEAM_COLUMNS)
+        xg_players_df = read_enrichment(xg_players_path, XG_PLAYER_COLUMNS)
         has_xg = True
         print(f"Loaded xG team data: {len(xg_teams_df)} rows")
         print(f"Loaded xG player data: {len(xg_players_df)} rows")
@@ -113,16 +214,14 @@ def main():
         print("xG data not available -- skipping xG enrichment")
 
     # -- CURRENT SEASON DATA -----------------------------------------------
-    current = df[df['season'] == CURRENT_SEASON].copy()
+    current = df[df['season'] == CURRENT_SEASON]
     matches_played = len(current)
     print(f"\nCurrent season ({CURRENT_SEASON}): {matches_played} matches")
 
     # -- SEASON STATUS -----------------------------------------------------
     # Detect whether the season is complete or in progress.
     # Teams may have different games played due to postponements.
-    home_counts = current.groupby('home_team').size()
-    away_counts = current.groupby('away_team').size()
-    games_per_team = home_counts.add(away_counts, fill_value=0)
+    games_per_team = pd.concat([current['home_team'], current['away_team']]).value_counts()
     matchdays_played = safe_int(games_per_team.max())
     season_complete = matches_played >= FULL_SEASON_MATCHES
 
@@ -138,99 +237,115 @@ def main():
     }
 
     # -- LEAGUE TABLE ------------------------------------------------------
-    def build_team_stats(team_matches, team_name):
-        home = team_matches[team_matches['home_team'] == team_name]
-        away = team_matches[team_matches['away_team'] == team_name]
-
-        hw = len(home[home['result'] == 'H'])
-        hd = len(home[home['result'] == 'D'])
-        hl = len(home[home['result'] == 'A'])
-        aw = len(away[away['result'] == 'A'])
-        ad = len(away[away['result'] == 'D'])
-        al = len(away[away['result'] == 'H'])
-
-        gf = safe_int(home['home_goals'].sum() + away['away_goals'].sum())
-        ga = safe_int(home['away_goals'].sum() + away['home_goals'].sum())
-
-        total_shots = safe_int(home['home_shots'].sum() + away['away_shots'].sum())
-        total_sot = safe_int(home['home_shots_on_target'].sum()
-                             + away['away_shots_on_target'].sum())
-        shot_acc = safe_float(total_sot / total_shots * 100) if total_shots > 0 else 0.0
-
-        # Clean sheets: matches where the team conceded 0 goals
-        cs_home = len(home[home['away_goals'] == 0])
-        cs_away = len(away[away['home_goals'] == 0])
-
-        played = hw + hd + hl + aw + ad + al
-        won = hw + aw
-        drawn = hd + ad
-        lost = hl + al
-        pts = won * 3 + drawn
-
-        return {
-            "team": team_name,
-            "played": played,
-            "won": won,
-            "drawn": drawn,
-            "lost": lost,
-            "goals_for": gf,
-            "goals_against": ga,
-            "goal_difference": gf - ga,
-            "points": pts,
-            "home_won": hw,
-            "home_drawn": hd,
-            "home_lost": hl,
-            "away_won": aw,
-            "away_drawn": ad,
-            "away_lost": al,
-            "clean_sheets": cs_home + cs_away,
-            "total_shots": total_shots,
-            "total_shots_on_target": total_sot,
-            "shot_accuracy": shot_acc,
-            "goals_per_game": safe_float(gf / played) if played > 0 else 0.0,
-        }
+    # All team stats come from two vectorized groupbys (one over home
+    # fixtures, one over away) instead of re-scanning the frame with ~10
+    # boolean masks per team. Result/clean-sheet flags are precomputed as
+    # int columns so every aggregation is a plain C-level sum.
+    flags = current.assign(
+        home_win=(current['result'] == 'H').astype('int64'),
+        draw=(current['result'] == 'D').astype('int64'),
+        away_win=(current['result'] == 'A').astype('int64'),
+        home_cs=(current['away_goals'] == 0).astype('int64'),
+        away_cs=(current['home_goals'] == 0).astype('int64'),
+    )
+    home_agg = flags.groupby('home_team', observed=True).agg(
+        home_won=('home_win', 'sum'),
+        home_drawn=('draw', 'sum'),
+        home_lost=('away_win', 'sum'),
+        gf_home=('home_goals', 'sum'),
+        ga_home=('away_goals', 'sum'),
+        shots_home=('home_shots', 'sum'),
+        sot_home=('home_shots_on_target', 'sum'),
+        cs_home=('home_cs', 'sum'),
+    )
+    away_agg = flags.groupby('away_team', observed=True).agg(
+        away_won=('away_win', 'sum'),
+        away_drawn=('draw', 'sum'),
+        away_lost=('home_win', 'sum'),
+        gf_away=('away_goals', 'sum'),
+        ga_away=('home_goals', 'sum'),
+        shots_away=('away_shots', 'sum'),
+        sot_away=('away_shots_on_target', 'sum'),
+        cs_away=('away_cs', 'sum'),
+    )
+    stats = home_agg.join(away_agg, how='outer').fillna(0).astype('int64')
+    stats.index.name = 'team'
+
+    played = (stats['home_won'] + stats['home_drawn'] + stats['home_lost']
+              + stats['away_won'] + stats['away_drawn'] + stats['away_lost'])
+    won = stats['home_won'] + stats['away_won']
+    drawn = stats['home_drawn'] + stats['away_drawn']
+    gf = stats['gf_home'] + stats['gf_away']
+    ga = stats['ga_home'] + stats['ga_away']
+    total_shots = stats['shots_home'] + stats['shots_away']
+    total_sot = stats['sot_home'] + stats['sot_away']
+
+    table = pd.DataFrame({
+        'played': played,
+        'won': won,
+        'drawn': drawn,
+        'lost': stats['home_lost'] + stats['away_lost'],
+        'goals_for': gf,
+        'goals_against': ga,
+        'goal_difference': gf - ga,
+        'points': won * 3 + drawn,
+        'home_won': stats['home_won'],
+        'home_drawn': stats['home_drawn'],
+        'home_lost': stats['home_lost'],
+        'away_won': stats['away_won'],
+        'away_drawn': stats['away_drawn'],
+        'away_lost': stats['away_lost'],
+        'clean_sheets': stats['cs_home'] + stats['cs_away'],
+        'total_shots': total_shots,
+        'total_shots_on_target': total_sot,
+        'shot_accuracy': (total_sot / total_shots.where(total_shots > 0) * 100)
+                         .fillna(0.0).round(2),
+        'goals_per_game': (gf / played.where(played > 0)).fillna(0.0).round(2),
+    }).reset_index()
+    table['team'] = table['team'].astype(str)
 
     teams = sorted(set(current['home_team'].unique()) | set(current['away_team'].unique()))
-    table_rows = [build_team_stats(current, t) for t in teams]
+    table_rows = table.to_dict('records')
 
     # Sort: points desc, then goal difference desc, then goals scored desc
     table_rows.sort(key=lambda x: (-x['points'], -x['goal_difference'], -x['goals_for']))
     for i, row in enumerate(table_rows):
         row['position'] = i + 1
 
+    # Dict index so the xG and money sections can look teams up directly
+    # instead of scanning the table list per team.
+    table_by_team = {r['team']: r for r in table_rows}
+
     # -- CUMULATIVE POINTS (for points race chart) -------------------------
     # Build matchday-by-matchday cumulative points for each team.
-    current_sorted = current.sort_values('date')
-    cumulative_points = {}
-
-    for team in teams:
-        home_matches = current_sorted[current_sorted['home_team'] == team].copy()
-        away_matches = current_sorted[current_sorted['away_team'] == team].copy()
-
-        home_matches = home_matches.assign(
-            pts=home_matches['result'].map({'H': 3, 'D': 1, 'A': 0})
-        )
-        away_matches = away_matches.assign(
-            pts=away_matches['result'].map({'A': 3, 'D': 1, 'H': 0})
+    # One long frame (a row per team-match) replaces the old per-team
+    # filter/concat loop: a single sort plus grouped cumsum/cumcount
+    # computes the points race for all 20 teams at once.
+    # astype after map: result may arrive as category (Parquet input),
+    # and mapping a categorical yields a categorical that cannot cumsum.
+    home_long = pd.DataFrame({
+        'team': current['home_team'].astype(str),
+        'date': current['date'],
+        'pts': current['result'].map({'H': 3, 'D': 1, 'A': 0}).astype('int64'),
+    })
+    away_long = pd.DataFrame({
+        'team': current['away_team'].astype(str),
+        'date': current['date'],
+        'pts': current['result'].map({'A': 3, 'D': 1, 'H': 0}).astype('int64'),
+    })
+    long_form = pd.concat([home_long, away_long], ignore_index=True)
+    long_form = long_form.sort_values(['team', 'date'], kind='stable')
+    long_form['matchday'] = long_form.groupby('team').cumcount() + 1
+    long_form['cumulative'] = long_form.groupby('team')['pts'].cumsum()
+
+    cumulative_points = {team: [] for team in teams}
+    for row in long_form.itertuples(index=False):
+        cumulative_points[row.team].append(
+            {"matchday": int(row.matchday), "points": int(row.cumulative)}
         )
 
-        all_matches = pd.concat([
-            home_matches[['date', 'pts']],
-            away_matches[['date', 'pts']]
-        ]).sort_values('date').reset_index(drop=True)
-
-        all_matches['cumulative'] = all_matches['pts'].cumsum()
-
-        cumulative_points[team] = [
-            {"matchday": i + 1, "points": safe_int(row['cumulative'])}
-            for i, row in all_matches.iterrows()
-        ]
-
     # -- MONTHLY TRENDS ----------------------------------------------------
-    current_with_month = current.copy()
-    current_with_month['month'] = current_with_month['date'].str[:7]
-
-    monthly = current_with_month.groupby('month').agg(
+    monthly = current.assign(month=current['date'].str[:7]).groupby('month').agg(
         matches=('match_id', 'count'),
         total_goals=('total_goals', 'sum'),
         home_wins=('result', lambda x: (x == 'H').sum()),
@@ -241,18 +356,12 @@ def main():
     monthly['avg_goals'] = (monthly['total_goals'] / monthly['matches']).round(2)
     monthly = monthly.sort_values('month')
 
-    monthly_trends = [
-        {
-            "month": row['month'],
-            "matches": safe_int(row['matches']),
-            "total_goals": safe_int(row['total_goals']),
-            "avg_goals": safe_float(row['avg_goals']),
-            "home_wins": safe_int(row['home_wins']),
-            "draws": safe_int(row['draws']),
-            "away_wins": safe_int(row['away_wins']),
-        }
-        for _, row in monthly.iterrows()
-    ]
+    # Columns are cast once here so to_dict('records') emits JSON-ready
+    # scalars without per-cell safe_int/safe_float calls.
+    int_cols = ['matches', 'total_goals', 'home_wins', 'draws', 'away_wins']
+    monthly[int_cols] = monthly[int_cols].fillna(0).astype('int64')
+    monthly_trends = monthly[['month', 'matches', 'total_goals', 'avg_goals',
+                              'home_wins', 'draws', 'away_wins']].to_dict('records')
 
     # -- HOME VS AWAY SPLIT ------------------------------------------------
     home_wins = safe_int((current['result'] == 'H').sum())
@@ -273,46 +382,62 @@ def main():
     }
 
     # -- REFEREE STATS -----------------------------------------------------
-    ref_groups = current.groupby('referee')
-    ref_stats = []
-    for ref, group in ref_groups:
-        n = len(group)
-        if n < 3:
-            continue
-        ref_stats.append({
-            "referee": ref,
-            "matches": safe_int(n),
-            "avg_goals": safe_float(group['total_goals'].mean()),
-            "avg_fouls": safe_float(group['total_fouls'].mean()),
-            "avg_cards": safe_float(group['total_cards'].mean()),
-            "total_reds": safe_int(group['home_reds'].sum() + group['away_reds'].sum()),
-        })
-    ref_stats.sort(key=lambda x: -x['avg_cards'])
+    # One agg over the referee groups instead of four .mean() calls per
+    # group inside a Python loop. Rounding happens before the sort so tie
+    # order among equal (rounded) card averages stays alphabetical.
+    refs = current.groupby('referee', observed=True).agg(
+        matches=('referee', 'size'),
+        avg_goals=('total_goals', 'mean'),
+        avg_fouls=('total_fouls', 'mean'),
+        avg_cards=('total_cards', 'mean'),
+        home_reds=('home_reds', 'sum'),
+        away_reds=('away_reds', 'sum'),
+    )
+    refs = refs[refs['matches'] >= 3]
+    refs['total_reds'] = (refs['home_reds'] + refs['away_reds']).astype('int64')
+    refs['matches'] = refs['matches'].astype('int64')
+    refs[['avg_goals', 'avg_fouls', 'avg_cards']] = (
+        refs[['avg_goals', 'avg_fouls', 'avg_cards']].astype('float64').round(2)
+    )
+    refs = refs.sort_values('avg_cards', ascending=False, kind='stable').reset_index()
+    refs['referee'] = refs['referee'].astype(str)
+    ref_stats = refs[['referee', 'matches', 'avg_goals', 'avg_fouls',
+                      'avg_cards', 'total_reds']].to_dict('records')
 
     # -- SCORELINE FREQUENCY -----------------------------------------------
-    current_scores = current.copy()
-    current_scores['score'] = (current_scores['home_goals'].astype(str)
-                               + '-' + current_scores['away_goals'].astype(str))
-    score_counts = current_scores['score'].value_counts().head(10)
+    scores = current['home_goals'].astype(str) + '-' + current['away_goals'].astype(str)
+    score_counts = scores.value_counts().head(10)
     scoreline_frequency = [
         {"score": score, "count": safe_int(count)}
         for score, count in score_counts.items()
     ]
 
     # -- SEASON COMPARISON -------------------------------------------------
-    season_comparison = []
-    for season_label in ACTIVE_SEASONS.keys():
-        s = df[df['season'] == season_label]
-        if len(s) == 0:
-            continue
-        season_comparison.append({
-            "season": season_label,
-            "matches": safe_int(len(s)),
-            "avg_goals": safe_float(s['total_goals'].mean()),
-            "avg_cards": safe_float(s['total_cards'].mean()),
-            "home_win_pct": safe_float((s['result'] == 'H').sum() / len(s) * 100),
-            "avg_fouls": safe_float(s['total_fouls'].mean()),
-        })
+    # One grouped pass over the full frame instead of re-filtering it per
+    # season; reindex keeps the ACTIVE_SEASONS ordering and drops seasons
+    # with no matches.
+    per_season = (
+        df.assign(home_win=(df['result'] == 'H').astype('int64'))
+        .groupby('season', observed=True)
+        .agg(
+            matches=('season', 'size'),
+            avg_goals=('total_goals', 'mean'),
+            avg_cards=('total_cards', 'mean'),
+            avg_fouls=('total_fouls', 'mean'),
+            home_wins=('home_win', 'sum'),
+        )
+        .reindex(list(ACTIVE_SEASONS.keys()))
+        .dropna(subset=['matches'])
+    )
+    per_season['matches'] = per_season['matches'].astype('int64')
+    per_season['home_win_pct'] = (per_season['home_wins'] / per_season['matches'] * 100).round(2)
+    per_season[['avg_goals', 'avg_cards', 'avg_fouls']] = (
+        per_season[['avg_goals', 'avg_cards', 'avg_fouls']].round(2)
+    )
+    per_season = per_season.reset_index()
+    per_season['season'] = per_season['season'].astype(str)
+    season_comparison = per_season[['season', 'matches', 'avg_goals', 'avg_cards',
+                                    'home_win_pct', 'avg_fouls']].to_dict('records')
 
     # -- CONDITIONAL: xG TABLE + SCATTER -----------------------------------
     xg_table = None
@@ -324,43 +449,48 @@ def main():
         xg_scatter = []
         shot_quality_rows = []
 
-        for _, row in xg_teams_df.iterrows():
-            team = row['team']
-            xg_for = safe_float(row.get('xg_for', 0))
-            xg_against = safe_float(row.get('xg_against', 0))
-            goals_for = safe_int(row.get('goals_for', 0))
-            goals_against = safe_int(row.get('goals_against', 0))
+        # reindex guarantees every column exists (missing ones become NaN),
+        # so the loop needs no per-row .get dispatch. Cast to float64 before
+        # rounding: Arrow-backed round can differ from numpy in the last
+        # ulp, which leaks long reprs into the JSON.
+        xgt = xg_teams_df.reindex(columns=XG_TEAM_COLUMNS)
+        xgt['team'] = xgt['team'].fillna('').astype(str)
+        xgt[['xg_for', 'xg_against']] = (
+            xgt[['xg_for', 'xg_against']].astype('float64').fillna(0.0).round(2)
+        )
+        xgt[['goals_for', 'goals_against']] = (
+            xgt[['goals_for', 'goals_against']].fillna(0).astype('int64')
+        )
+        xgt['xg_difference'] = (xgt['xg_for'] - xgt['xg_against']).round(2)
+        xgt['actual_diff'] = (xgt['goals_for'] - xgt['xg_for']).round(2)
 
-            # xPoints estimation: 3 * xW + 1 * xD
-            # Simplified: use xG difference as proxy
-            xg_diff = xg_for - xg_against
+        for row in xgt.itertuples(index=False):
+            team = row.team
 
             # Find actual points from league table
-            actual_pts = 0
-            for tr in table_rows:
-                if tr['team'] == team:
-                    actual_pts = tr['points']
-                    break
+            actual_pts = table_by_team.get(team, {}).get('points', 0)
 
             xg_table_rows.append({
                 "team": team,
-                "xg_for": xg_for,
-                "xg_against": xg_against,
-                "goals_for": goals_for,
-                "goals_against": goals_against,
-                "xg_difference": safe_float(xg_diff),
+                "xg_for": row.xg_for,
+                "xg_against": row.xg_against,
+                "goals_for": row.goals_for,
+                "goals_against": row.goals_against,
+                # xPoints estimation: 3 * xW + 1 * xD
+                # Simplified: use xG difference as proxy
+                "xg_difference": row.xg_difference,
                 "actual_points": actual_pts,
             })
 
             xg_scatter.append({
                 "team": team,
-                "total_xg": xg_for,
-                "actual_goals": goals_for,
-                "difference": safe_float(goals_for - xg_for),
+                "total_xg": row.xg_for,
+                "actual_goals": row.goals_for,
+                "difference": row.actual_diff,
             })
 
             # Shot quality uses total shots from the league table for the denominator
-            team_table = next((t for t in table_rows if t['team'] == team), None)
+            team_table = table_by_team.get(team)
             if team_table and team_table['total_shots'] > 0:
                 total_shots_team = team_table['total_shots']
                 shot_quality_rows.append({
@@ -368,7 +498,7 @@ def main():
                     "total_shots": total_shots_team,
                     # 3 decimal places -- the range across teams is only ~0.10-0.15,
                     # so 2dp collapses half the league to the same value
-                    "xg_per_shot": safe_float(xg_for / total_shots_team, 3),
+                    "xg_per_shot": round(row.xg_for / total_shots_team, 3),
                 })
 
         xg_table_rows.sort(key=lambda x: -x['xg_difference'])
@@ -383,190 +513,235 @@ def main():
 
     if has_xg and xg_players_df is not None:
         xg_players_clean = xg_players_df.dropna(subset=['player_name'])
-        scorers = xg_players_clean[xg_players_clean['goals'] > 0].copy()
-        scorers = scorers.sort_values('goals', ascending=False).head(10)
-
-        top_scorers = []
-        for _, row in scorers.iterrows():
-            goals = safe_int(row['goals'])
-            xg_val = safe_float(row.get('xg', 0))
-            top_scorers.append({
-                "player_name": safe_str(row['player_name']),
-                "team": safe_str(row['team']),
-                "goals": goals,
-                "assists": safe_int(row.get('assists', 0)),
-                "xg": xg_val,
-                "xa": safe_float(row.get('xa', 0)),
-                "minutes": safe_int(row.get('minutes', 0)),
-                "goals_minus_xg": safe_float(goals - xg_val),
-                "position": str(row.get('position', '')),
-            })
+        scorers = xg_players_clean[xg_players_clean['goals'] > 0]
+        scorers = scorers.nlargest(10, 'goals')
+
+        scorers = scorers.reindex(columns=XG_PLAYER_COLUMNS)
+        scorers['player_name'] = scorers['player_name'].astype(str)
+        scorers['team'] = scorers['team'].fillna('').astype(str)
+        scorers['position'] = scorers['position'].fillna('').astype(str)
+        scorers[['xg', 'xa']] = scorers[['xg', 'xa']].astype('float64').fillna(0.0).round(2)
+        scorers[['goals', 'assists', 'minutes']] = (
+            scorers[['goals', 'assists', 'minutes']].fillna(0).astype('int64')
+        )
+        scorers['goals_minus_xg'] = (scorers['goals'] - scorers['xg']).round(2)
+
+        top_scorers = [
+            {
+                "player_name": row.player_name,
+                "team": row.team,
+                "goals": row.goals,
+                "assists": row.assists,
+                "xg": row.xg,
+                "xa": row.xa,
+                "minutes": row.minutes,
+                "goals_minus_xg": row.goals_minus_xg,
+                "position": row.position,
+            }
+            for row in scorers.itertuples(index=False)
+        ]
 
     if has_fpl and players_df is not None:
-        value_df = players_df[players_df['goals'] > 0].copy()
+        value_df = players_df[players_df['goals'] > 0]
         if 'price' in value_df.columns:
             value_df = value_df[value_df['price'] > 0]
+            value_df['price'] = value_df['price'].astype('float64')
             value_df['goals_per_million'] = (value_df['goals'] / value_df['price']).round(2)
-            value_df = value_df.sort_values('goals_per_million', ascending=False).head(10)
-
-            player_value = [
-                {
-                    "player_name": safe_str(row.get('player_name', '')),
-                    "team": safe_str(row['team']),
-                    "price": safe_float(row['price'], 1),
-                    "goals": safe_int(row['goals']),
-                    "goals_per_million": safe_float(row['goals_per_million']),
-                }
-                for _, row in value_df.iterrows()
-            ]
+            value_df = value_df.nlargest(10, 'goals_per_million')
+
+            value_df = value_df.assign(
+                player_name=value_df['player_name'].fillna('').astype(str),
+                team=value_df['team'].fillna('').astype(str),
+                price=value_df['price'].fillna(0.0).round(1),
+                goals=value_df['goals'].fillna(0).astype('int64'),
+            )
+            player_value = value_df[['player_name', 'team', 'price', 'goals',
+                                     'goals_per_million']].to_dict('records')
 
     # -- CONDITIONAL: PLAYER LEADERBOARDS ----------------------------------
     # Comprehensive player stats from FPL data, enriched with xG where available
     player_leaderboards = None
 
     if has_fpl and players_df is not None:
+        # Cast text and count columns once so the leaderboard loops below
+        # read JSON-ready scalars straight out of to_dict('records').
+        # The copy is lazy under copy-on-write; it exists so the casts
+        # don't write through to players_df, which the money section reuses.
         fpl = players_df.copy()
+        for col in ('player_name', 'team', 'position'):
+            fpl[col] = fpl[col].fillna('').astype(str)
+        for col in ('goals', 'assists', 'minutes', 'yellow_cards', 'red_cards'):
+            if col in fpl.columns:
+                fpl[col] = fpl[col].fillna(0).astype('int64')
+        if 'price' in fpl.columns:
+            fpl['price'] = fpl['price'].astype('float64').fillna(0.0)
+
+        # Derived leaderboard columns, computed once for the whole frame.
+        # Per-90 rates only count players with at least a full match played.
+        mins = fpl['minutes'].where(fpl['minutes'] >= 90)
+        fpl['goals_per_90'] = (fpl['goals'] / mins * 90).round(2).fillna(0.0)
+        fpl['assists_per_90'] = (fpl['assists'] / mins * 90).round(2).fillna(0.0)
+        fpl['total_cards'] = fpl['yellow_cards'] + fpl['red_cards']
+
+        def normalize_names(series):
+            """Lowercase a whole name column and strip it to ASCII in one
+            C-level pass, so Ekitiké matches Ekitike, etc."""
+            return (series.str.normalize('NFKD')
+                    .str.encode('ascii', 'ignore').str.decode('ascii')
+                    .str.lower())
 
         def strip_accents(s):
-            """Remove diacritics so Ekitiké matches Ekitike, etc."""
-            nfkd = unicodedata.normalize('NFKD', s)
-            return ''.join(c for c in nfkd if not unicodedata.combining(c))
-
-        # Build multiple xG lookup indexes for robust name matching.
-        # FPL uses short names (Haaland), Understat uses full names (Erling Haaland),
-        # and transferred players have comma-separated teams in Understat.
-        xg_by_name = {}       # (full_name, team) -> data
-        xg_by_last = {}       # (last_name_normalized, team) -> data
-        xg_by_team = {}       # team -> list of (name_normalized, data) for substring search
+            """Scalar twin of normalize_names for the per-row fallbacks."""
+            return unicodedata.normalize('NFKD', s).encode('ascii', 'ignore').decode('ascii')
+
+        # Build one tidy xG lookup table for merge-based name matching.
+        # FPL uses short names (Haaland), Understat uses full names (Erling
+        # Haaland), so normalized and last-name keys are precomputed, and
+        # transferred players' comma-separated teams are exploded into their
+        # own rows. drop_duplicates(keep='last') at join time mirrors the
+        # overwrite semantics of the old dict indexes.
+        xg_cols = ['xg', 'xa', 'shots', 'key_passes', 'npxg']
+        xg_lookup = None
+        xg_by_last = {}       # (last_name_normalized, team) -> record, for fallbacks
+        xg_by_team = {}       # team -> [(name_normalized, record)] for substring search
         if has_xg and xg_players_df is not None:
-            for _, xr in xg_players_df.dropna(subset=['player_name']).iterrows():
-                name = safe_str(xr['player_name'])
-                teams_raw = safe_str(xr['team'])
-                data = {
-                    "xg": safe_float(xr.get('xg', 0)),
-                    "xa": safe_float(xr.get('xa', 0)),
-                    "shots": safe_int(xr.get('shots', 0)),
-                    "key_passes": safe_int(xr.get('key_passes', 0)),
-                    "npxg": safe_float(xr.get('npxg', 0)),
-                }
-                name_norm = strip_accents(name).lower()
-                parts = name_norm.split()
-                last = parts[-1] if parts else name_norm
-
-                # Understat uses comma-separated teams for mid-season transfers
-                teams = [t.strip() for t in teams_raw.split(',')]
-                for team in teams:
-                    xg_by_name[(name, team)] = data
-                    xg_by_last[(last, team)] = data
-                    if team not in xg_by_team:
-                        xg_by_team[team] = []
-                    xg_by_team[team].append((name_norm, data))
-
-        def enrich(row):
-            """Match FPL player to Understat xG data using multiple strategies."""
-            pname = safe_str(row['player_name'])
-            fname = safe_str(row.get('full_name', ''))
-            team = safe_str(row['team'])
+            xg_lookup = xg_players_df.dropna(subset=['player_name'])
+            for col in xg_cols:
+                if col not in xg_lookup.columns:
+                    xg_lookup[col] = 0
+            xg_lookup[['xg', 'xa', 'npxg']] = (
+                xg_lookup[['xg', 'xa', 'npxg']].astype('float64').fillna(0.0).round(2)
+            )
+            xg_lookup[['shots', 'key_passes']] = (
+                xg_lookup[['shots', 'key_passes']].fillna(0).astype('int64')
+            )
+            xg_lookup['name'] = xg_lookup['player_name'].astype(str)
+            xg_lookup['name_norm'] = normalize_names(xg_lookup['name'])
+            xg_lookup['last_norm'] = (
+                xg_lookup['name_norm'].str.split().str[-1].fillna(xg_lookup['name_norm'])
+            )
+            # Understat uses comma-separated teams for mid-season transfers
+            xg_lookup['team'] = xg_lookup['team'].astype(str).str.split(',')
+            xg_lookup = xg_lookup.explode('team', ignore_index=True)
+            xg_lookup['team'] = xg_lookup['team'].str.strip()
+            xg_lookup = xg_lookup[['name', 'name_norm', 'last_norm', 'team'] + xg_cols]
+
+            dedup_last = xg_lookup.drop_duplicates(['last_norm', 'team'], keep='last')
+            for rec in dedup_last.to_dict('records'):
+                xg_by_last[(rec['last_norm'], rec['team'])] = rec
+            for rec in xg_lookup.to_dict('records'):
+                xg_by_team.setdefault(rec['team'], []).append((rec['name_norm'], rec))
+
+        def enrich_frame(rows):
+            """Attach xG columns to a frame of FPL rows.
+
+            Strategies run in the same order as the old per-row matcher --
+            exact short name, exact full name, last name (each a vectorized
+            left-join against the lookup table), then dot-split and substring
+            fallbacks in Python for the handful of rows the joins missed.
+            Unmatched rows keep NaN in the xG columns.
+            """
+            out = rows.reset_index(drop=True)
+            for col in xg_cols:
+                out[col] = np.nan
+            if xg_lookup is None or len(xg_lookup) == 0:
+                return out
+
+            out['_team'] = out['team'].astype(str)
+            out['_pname'] = out['player_name'].astype(str)
+            out['_pnorm'] = normalize_names(out['_pname'])
+            if 'full_name' in out.columns:
+                out['_fname'] = out['full_name'].fillna('').astype(str)
+            else:
+                out['_fname'] = ''
+            out['_matched'] = False
+
+            def fill_from(left_keys, right_keys):
+                todo = ~out['_matched']
+                if not todo.any():
+                    return
+                lookup = xg_lookup.drop_duplicates(right_keys, keep='last')
+                sub = out.loc[todo, left_keys]
+                merged = sub.merge(lookup[right_keys + xg_cols], how='left',
+                                   left_on=left_keys, right_on=right_keys)
+                merged.index = sub.index
+                hit = merged['xg'].notna()
+                out.loc[hit[hit].index, xg_cols] = merged.loc[hit, xg_cols]
+                out.loc[hit[hit].index, '_matched'] = True
 
             # 1. Exact match on (short_name, team) -- covers single-name players
-            result = xg_by_name.get((pname, team))
-            if result:
-                return result
-
+            fill_from(['_pname', '_team'], ['name', 'team'])
             # 2. Exact match on (full_name, team) -- covers identical full names
-            if fname:
-                result = xg_by_name.get((fname, team))
-                if result:
-                    return result
-
+            fill_from(['_fname', '_team'], ['name', 'team'])
             # 3. Last name match -- FPL "Haaland" matches last word of "Erling Haaland"
-            pname_norm = strip_accents(pname).lower()
-            result = xg_by_last.get((pname_norm, team))
-            if result:
-                return result
-
-            # 4. Dot-split fallback -- FPL uses "B.Fernandes" or "Kroupi.Jr"
-            # Try each dot-separated part as a last name match
-            if '.' in pname:
-                parts = [strip_accents(p).lower() for p in pname.split('.') if len(p) > 2]
-                for part in parts:
-                    result = xg_by_last.get((part, team))
-                    if result:
-                        return result
-
-            # 5. Substring search -- handles "Enzo" matching "enzo fernandez"
-            candidates = xg_by_team.get(team, [])
-            clean = pname_norm.rstrip('.')
-            for xg_name_norm, data in candidates:
-                if clean in xg_name_norm:
-                    return data
-
-            return {}
-
-        def per90(stat, minutes):
-            """Calculate per-90-minute rate."""
-            if minutes < 90:
-                return 0
-            return safe_float(stat / minutes * 90, 2)
+            fill_from(['_pnorm', '_team'], ['last_norm', 'team'])
+
+            # 4 & 5. Dot-split ("B.Fernandes", "Kroupi.Jr") and substring
+            # ("Enzo" in "enzo fernandez") fallbacks on whatever is left.
+            for i in out.index[~out['_matched']]:
+                pname = out.at[i, '_pname']
+                team = out.at[i, '_team']
+                rec = None
+                if '.' in pname:
+                    for part in pname.split('.'):
+                        if len(part) > 2:
+                            rec = xg_by_last.get((strip_accents(part).lower(), team))
+                            if rec:
+                                break
+                if rec is None:
+                    clean = out.at[i, '_pnorm'].rstrip('.')
+                    for xg_name_norm, cand in xg_by_team.get(team, []):
+                        if clean in xg_name_norm:
+                            rec = cand
+                            break
+                if rec is not None:
+                    for col in xg_cols:
+                        out.at[i, col] = rec[col]
+            return out.drop(columns=['_team', '_pname', '_pnorm', '_fname', '_matched'])
 
         # -- GOAL SCORERS (top 20) --
-        scorers_df = fpl[fpl['goals'] > 0].sort_values('goals', ascending=False).head(20)
+        scorers_df = fpl[fpl['goals'] > 0].nlargest(20, 'goals')
         goal_scorers = []
-        for _, row in scorers_df.iterrows():
-            xg_data = enrich(row)
-            mins = safe_int(row['minutes'])
-            goals = safe_int(row['goals'])
+        for row in enrich_frame(scorers_df).to_dict('records'):
             goal_scorers.append({
                 "rank": len(goal_scorers) + 1,
-                "player_name": safe_str(row['player_name']),
-                "team": safe_str(row['team']),
-                "position": safe_str(row['position']),
-                "goals": goals,
-                "assists": safe_int(row['assists']),
-                "minutes": mins,
-                "goals_per_90": per90(goals, mins),
-                "price": safe_float(row.get('price', 0), 1),
-                "xg": xg_data.get('xg'),
-                "shots": xg_data.get('shots'),
+                "player_name": row['player_name'],
+                "team": row['team'],
+                "position": row['position'],
+                "goals": row['goals'],
+                "assists": row['assists'],
+                "minutes": row['minutes'],
+                "goals_per_90": row['goals_per_90'],
+                "price": round(row.get('price', 0.0), 1),
+                "xg": None if pd.isna(row['xg']) else row['xg'],
+                "shots": None if pd.isna(row['shots']) else int(row['shots']),
             })
 
         # -- ASSIST LEADERS (top 15) --
-        assists_df = fpl[fpl['assists'] > 0].sort_values('assists', ascending=False).head(15)
+        assists_df = fpl[fpl['assists'] > 0].nlargest(15, 'assists')
         assist_leaders = []
-        for _, row in assists_df.iterrows():
-            xg_data = enrich(row)
-            mins = safe_int(row['minutes'])
-            assists = safe_int(row['assists'])
+        for row in enrich_frame(assists_df).to_dict('records'):
             assist_leaders.append({
                 "rank": len(assist_leaders) + 1,
-                "player_name": safe_str(row['player_name']),
-                "team": safe_str(row['team']),
-                "position": safe_str(row['position']),
-                "assists": assists,
-                "goals": safe_int(row['goals']),
-                "minutes": mins,
-                "assists_per_90": per90(assists, mins),
-                "xa": xg_data.get('xa'),
-                "key_passes": xg_data.get('key_passes'),
-                "price": safe_float(row.get('price', 0), 1),
+                "player_name": row['player_name'],
+                "team": row['team'],
+                "position": row['position'],
+                "assists": row['assists'],
+                "goals": row['goals'],
+                "minutes": row['minutes'],
+                "assists_per_90": row['assists_per_90'],
+                "xa": None if pd.isna(row['xa']) else row['xa'],
+                "key_passes": None if pd.isna(row['key_passes']) else int(row['key_passes']),
+                "price": round(row.get('price', 0.0), 1),
             })
 
         # -- MINUTES IRON MEN (top player per team by minutes) --
-        iron_men = []
-        for team_name in sorted(fpl['team'].unique()):
-            team_players = fpl[fpl['team'] == team_name]
-            top_player = team_players.sort_values('minutes', ascending=False).iloc[0]
-            mins = safe_int(top_player['minutes'])
-            iron_men.append({
-                "player_name": safe_str(top_player['player_name']),
-                "team": team_name,
-                "position": safe_str(top_player['position']),
-                "minutes": mins,
-                "games_equivalent": safe_float(mins / 90, 1),
-                "goals": safe_int(top_player['goals']),
-                "assists": safe_int(top_player['assists']),
-            })
-        iron_men.sort(key=lambda x: -x['minutes'])
+        # One idxmax per group replaces a filter+sort per team.
+        iron = fpl.loc[fpl.groupby('team')['minutes'].idxmax()]
+        iron = iron.assign(games_equivalent=(iron['minutes'] / 90).round(1))
+        iron = iron.sort_values('minutes', ascending=False, kind='stable')
+        iron_men = iron[['player_name', 'team', 'position', 'minutes',
+                         'games_equivalent', 'goals', 'assists']].to_dict('records')
 
         # -- GOALS BY POSITION --
         goals_by_pos = []
@@ -584,37 +759,36 @@ def main():
             })
 
         # -- BEST VALUE (goals + assists per million) --
-        active = fpl[(fpl['minutes'] >= 450) & (fpl['price'] > 0)].copy()
+        active = fpl[(fpl['minutes'] >= 450) & (fpl['price'] > 0)]
         active['ga'] = active['goals'] + active['assists']
         active['ga_per_million'] = (active['ga'] / active['price']).round(2)
-        best_value = active.sort_values('ga_per_million', ascending=False).head(15)
+        best_value = active.nlargest(15, 'ga_per_million')
         value_players = []
-        for _, row in best_value.iterrows():
+        for row in best_value.to_dict('records'):
             value_players.append({
                 "rank": len(value_players) + 1,
-                "player_name": safe_str(row['player_name']),
-                "team": safe_str(row['team']),
-                "position": safe_str(row['position']),
-                "price": safe_float(row['price'], 1),
-                "goals": safe_int(row['goals']),
-                "assists": safe_int(row['assists']),
-                "ga_per_million": safe_float(row['ga_per_million']),
-                "minutes": safe_int(row['minutes']),
+                "player_name": row['player_name'],
+                "team": row['team'],
+                "position": row['position'],
+                "price": round(row['price'], 1),
+                "goals": row['goals'],
+                "assists": row['assists'],
+                "ga_per_million": row['ga_per_million'],
+                "minutes": row['minutes'],
             })
 
         # -- DISCIPLINARY (most cards) --
-        fpl['total_cards'] = fpl['yellow_cards'] + fpl['red_cards']
-        card_df = fpl[fpl['total_cards'] > 0].sort_values('total_cards', ascending=False).head(10)
+        card_df = fpl[fpl['total_cards'] > 0].nlargest(10, 'total_cards')
         most_cards = []
-        for _, row in card_df.iterrows():
+        for row in card_df.to_dict('records'):
             most_cards.append({
-                "player_name": safe_str(row['player_name']),
-                "team": safe_str(row['team']),
-                "position": safe_str(row['position']),
-                "yellows": safe_int(row['yellow_cards']),
-                "reds": safe_int(row['red_cards']),
-                "total_cards": safe_int(row['total_cards']),
-                "minutes": safe_int(row['minutes']),
+                "player_name": row['player_name'],
+                "team": row['team'],
+                "position": row['position'],
+                "yellows": row['yellow_cards'],
+                "reds": row['red_cards'],
+                "total_cards": row['total_cards'],
+                "minutes": row['minutes'],
             })
 
         player_leaderboards = {
@@ -636,12 +810,13 @@ def main():
         squad_values = players_df.groupby('team')['price'].sum().reset_index()
         squad_values.columns = ['team', 'squad_value']
 
+        squad_values['squad_value'] = squad_values['squad_value'].astype('float64').round(1)
         money_rows = []
-        for _, sv in squad_values.iterrows():
+        for sv in squad_values.to_dict('records'):
             team = sv['team']
-            value = safe_float(sv['squad_value'], 1)
+            value = sv['squad_value']
             # Find this team's points from league table
-            team_row = next((t for t in table_rows if t['team'] == team), None)
+            team_row = table_by_team.get(team)
             if not team_row:
                 continue
             pts = team_row['points']
@@ -652,39 +827,36 @@ def main():
                 "squad_value": value,
                 "points": pts,
                 "played": played,
-                "points_per_match": safe_float(pts / played if played > 0 else 0),
+                "points_per_match": round(pts / played, 2) if played > 0 else 0.0,
             })
 
         if money_rows:
             # Compute expected points from a simple linear regression of value vs pts
-            values = [r['squad_value'] for r in money_rows]
-            points = [r['points'] for r in money_rows]
-            n = len(values)
-            mean_v = sum(values) / n
-            mean_p = sum(points) / n
-            cov = sum((v - mean_v) * (p - mean_p) for v, p in zip(values, points))
-            var = sum((v - mean_v) ** 2 for v in values)
-            slope = cov / var if var > 0 else 0
-            intercept = mean_p - slope * mean_v
-
-            for row in money_rows:
-                expected = slope * row['squad_value'] + intercept
-                row['expected_points'] = safe_float(expected)
-                row['over_under'] = safe_float(row['points'] - expected)
+            v = np.asarray([r['squad_value'] for r in money_rows], dtype='float64')
+            p = np.asarray([r['points'] for r in money_rows], dtype='float64')
+            if np.ptp(v) > 0:
+                slope, intercept = np.polyfit(v, p, 1)
+                r = np.corrcoef(v, p)[0, 1]
+                # corrcoef is NaN when points are constant across teams
+                r_squared = r * r if np.isfinite(r) else 0.0
+            else:
+                # Degenerate case: every squad costs the same
+                slope, intercept, r_squared = 0.0, p.mean(), 0.0
+
+            expected = slope * v + intercept
+            over_under = p - expected
+            for row, exp_val, ou in zip(money_rows, expected, over_under):
+                row['expected_points'] = round(float(exp_val), 2)
+                row['over_under'] = round(float(ou), 2)
 
             money_rows.sort(key=lambda x: -x['over_under'])
 
             money_vs_points = {
                 "teams": money_rows,
                 "regression": {
-                    "slope": safe_float(slope, 4),
-                    "intercept": safe_float(intercept),
-                    "r_squared": safe_float(
-                        (cov ** 2) / (var * sum((p - mean_p) ** 2 for p in points))
-                        if var > 0 and sum((p - mean_p) ** 2 for p in points) > 0
-                        else 0,
-                        3
-                    ),
+                    "slope": round(float(slope), 4),
+                    "intercept": round(float(intercept), 2),
+                    "r_squared": round(float(r_squared), 3),
                 },
             }
             print(f"Money vs Points: R-squared = {money_vs_points['regression']['r_squared']}")
@@ -717,14 +889,25 @@ def main():
         "money_vs_points": money_vs_points,
     }
 
-    # Scrub any lingering NaN/Infinity before serialization -- pandas can
-    # produce these and Python's json module writes literal NaN which JS
-    # cannot parse.
-    output = sanitize_for_json(output)
-
-    output_path = os.path.join(OUTPUT_DIR, 'dashboard_data.json')
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(output, f, indent=2, default=str)
+    # Write to a temp file and os.replace so a crash mid-write can never
+    # leave a truncated dashboard_data.json behind. The stamp goes second:
+    # if we die in between, the next run just redoes the work.
+    tmp_path = output_path + '.tmp'
+    if orjson is not None:
+        with open(tmp_path, 'wb') as f:
+            f.write(orjson.dumps(
+                output,
+                option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY,
+            ))
+    else:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            # allow_nan=False makes any NaN that slipped past the safe_*
+            # helpers a loud error rather than a silently broken dashboard.
+            json.dump(output, f, indent=2, cls=NumpyJSONEncoder, allow_nan=False)
+    os.replace(tmp_path, output_path)
+    with open(stamp_path + '.tmp', 'w', encoding='utf-8') as f:
+        f.write(stamp)
+    os.replace(stamp_path + '.tmp', stamp_path)
 
     print(f"\nSaved: {output_path}")
     sections = sum(1 for k, v in output.items()
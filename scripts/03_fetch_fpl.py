@@ -12,6 +12,9 @@ If this script fails or is never run, the pipeline still works.
 Run: python scripts/03_fetch_fpl.py
 """
 
+import hashlib
+import io
+import json
 import os
 import sys
 import time
@@ -20,6 +23,7 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 try:
     import pandas as pd
+    import numpy as np
 except ImportError:
     print("ERROR: pandas is required. Run: pip install pandas")
     sys.exit(1)
@@ -30,26 +34,159 @@ except ImportError:
     print("ERROR: requests is required. Run: pip install requests")
     sys.exit(1)
 
+from requests.adapters import HTTPAdapter, Retry
+
+# One pooled session for the whole run: every GET goes to the same one or
+# two hosts, so keep-alive skips a TCP+TLS handshake per request, and the
+# adapter retries transient failures with exponential backoff.
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=4, pool_maxsize=8,
+    max_retries=Retry(total=3, backoff_factor=0.5,
+                      status_forcelist=(429, 500, 502, 503, 504))))
+
+# Optional: pyarrow parses the downloaded CSVs in multithreaded native code
+try:
+    import pyarrow  # noqa: F401
+    READ_CSV_KWARGS = {'engine': 'pyarrow'}
+except ImportError:
+    READ_CSV_KWARGS = {}
+
 from config import (
-    ACTIVE_SEASONS, CURRENT_SEASON,
-    FPL_GITHUB_BASE, FPL_LIVE_API, FPL_NAME_MAP,
+    CURRENT_FPL_BASE, CURRENT_SEASON, CURRENT_SEASON_INFO,
+    FPL_LIVE_API, FPL_NAME_MAP,
 )
 
 # -- PATHS -----------------------------------------------------------------
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 CLEAN_DIR = os.path.join(BASE_DIR, 'data', 'cleaned')
+HTTP_CACHE_DIR = os.path.join(BASE_DIR, 'data', 'http_cache')
 os.makedirs(CLEAN_DIR, exist_ok=True)
+os.makedirs(HTTP_CACHE_DIR, exist_ok=True)
 
 REQUEST_DELAY = 1.0
 
+# Fixed float formatting keeps every float column on the fast C writer
+# path and makes the CSV output byte-stable across platforms
+CSV_KWARGS = {'index': False, 'float_format': '%.2f', 'lineterminator': '\n'}
+
 POSITION_MAP = {1: 'GK', 2: 'DEF', 3: 'MID', 4: 'FWD'}
+POSITION_CATEGORIES = ['GK', 'DEF', 'MID', 'FWD', 'UNK']
+
+# Columns actually consumed from each vaastav CSV, with explicit dtypes so
+# the parser skips type inference and never materializes the unused columns
+PLAYER_USECOLS = [
+    'web_name', 'first_name', 'second_name', 'team', 'element_type',
+    'now_cost', 'goals_scored', 'assists', 'clean_sheets', 'minutes',
+    'yellow_cards', 'red_cards', 'total_points', 'bonus',
+]
+PLAYER_DTYPES = {
+    'team': 'int16', 'element_type': 'int8', 'now_cost': 'float64',
+    'goals_scored': 'int32', 'assists': 'int32', 'clean_sheets': 'int32',
+    'minutes': 'int32', 'yellow_cards': 'int32', 'red_cards': 'int32',
+    'total_points': 'int32', 'bonus': 'int32',
+}
+TEAM_USECOLS = ['id', 'name']
+TEAM_DTYPES = {'id': 'int16'}
+FIXTURE_USECOLS = [
+    'kickoff_time', 'team_h', 'team_a', 'team_h_score', 'team_a_score',
+    'finished',
+]
+# Scores stay float64: unfinished fixtures have empty score cells
+FIXTURE_DTYPES = {'team_h': 'int16', 'team_a': 'int16',
+                  'team_h_score': 'float64', 'team_a_score': 'float64'}
+
+
+def save_frame(df, csv_path):
+    """Write a frame as CSV plus a typed Parquet twin when pyarrow exists.
+
+    The CSV stays the human-inspectable artifact; the Parquet twin keeps
+    the dtype work (categoricals, small ints) so 02_transform.py loads
+    typed columns without re-inference. Same convention as 01_clean.py.
+    """
+    df.to_csv(csv_path, **CSV_KWARGS)
+    try:
+        df.to_parquet(csv_path[:-4] + '.parquet', engine='pyarrow',
+                      compression='zstd', compression_level=3)
+    except ImportError:
+        pass
+
+
+def read_remote_csv(resp, wanted, dtypes):
+    """Parse a downloaded CSV keeping only the wanted columns that exist.
+
+    Parsing goes through BytesIO(resp.content) rather than a streaming
+    resp.raw handle: the full body is buffered anyway so fetch_url can
+    write it to the on-disk HTTP cache, and feeding raw bytes already
+    avoids the unicode round-trip that resp.text would force. The
+    largest of these files is ~500KB, so there is no memory pressure
+    to stream away.
+    """
+    buf = io.BytesIO(resp.content)
+    header = pd.read_csv(buf, nrows=0)
+    cols = [c for c in header.columns if c in wanted]
+    buf.seek(0)
+    return pd.read_csv(buf, usecols=cols,
+                       dtype={k: v for k, v in dtypes.items() if k in cols},
+                       **READ_CSV_KWARGS)
+
+
+def _read_meta(filepath):
+    """Load the cached ETag/Last-Modified headers for a downloaded file."""
+    try:
+        with open(filepath + '.meta.json', 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_meta(filepath, response):
+    """Store validator headers so the next run can send a conditional GET."""
+    meta = {k: response.headers.get(k) for k in ('ETag', 'Last-Modified')}
+    if any(meta.values()):
+        with open(filepath + '.meta.json', 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+
+class _CachedBody:
+    """Stand-in for requests.Response when a 304 lets us reuse cached bytes."""
+
+    def __init__(self, content):
+        self.content = content
+
+    def json(self):
+        return json.loads(self.content)
 
 
 def fetch_url(url, description=""):
-    """Fetch URL with error handling. Returns response or None."""
+    """Fetch URL with error handling. Returns response or None.
+
+    Responses are cached under data/http_cache/ keyed by the URL's sha1.
+    When the server exposes ETag/Last-Modified validators, the next run
+    sends a conditional GET and a 304 reuses the cached body -- closed
+    historical seasons on GitHub never change, so a rerun costs a few
+    header bytes instead of re-downloading ~500KB of CSV.
+    """
+    cache_path = os.path.join(
+        HTTP_CACHE_DIR, hashlib.sha1(url.encode('utf-8')).hexdigest())
+    headers = {}
+    if os.path.exists(cache_path):
+        meta = _read_meta(cache_path)
+        if meta.get('ETag'):
+            headers['If-None-Match'] = meta['ETag']
+        if meta.get('Last-Modified'):
+            headers['If-Modified-Since'] = meta['Last-Modified']
+
     try:
-        response = requests.get(url, timeout=30)
+        response = _SESSION.get(url, headers=headers, timeout=30)
+        if response.status_code == 304:
+            print(f"  Not modified -- using cached: {description}")
+            with open(cache_path, 'rb') as f:
+                return _CachedBody(f.read())
         response.raise_for_status()
+        with open(cache_path, 'wb') as f:
+            f.write(response.content)
+        _write_meta(cache_path, response)
         return response
     except requests.exceptions.Timeout:
         print(f"  TIMEOUT: {description}")
@@ -67,11 +204,104 @@ def normalize_team(name):
     return FPL_NAME_MAP.get(name, name)
 
 
+def resolve_team_ids(team_lookup):
+    """Fuse the id->FPL-name and FPL-name->canonical maps into one dict.
+
+    Every consumer after this point resolves a team id with a single
+    dict lookup (or one .map() pass) instead of two chained lookups.
+    """
+    return {tid: normalize_team(name) for tid, name in team_lookup.items()}
+
+
+def team_id_table(canonical_lookup):
+    """Dense id->canonical-name numpy table.
+
+    FPL team ids run 1..20, so a fancy-index gather through this table
+    resolves a whole id column in one C-level take instead of N hashmap
+    lookups.
+    """
+    size = int(max(canonical_lookup, default=0)) + 1
+    table = np.full(size, None, dtype=object)
+    for tid, name in canonical_lookup.items():
+        table[int(tid)] = name
+    return table
+
+
+def resolve_ids(id_series, table):
+    """Gather canonical names for an id column; unknown ids -> str(id)."""
+    ids = id_series.to_numpy()
+    clipped = np.clip(ids, 0, len(table) - 1)
+    names = table[clipped]
+    missing = (ids != clipped) | pd.isna(names)
+    if missing.any():
+        names = np.where(missing, ids.astype(str), names)
+    return pd.Series(names, index=id_series.index)
+
+
+def _build_players_df(raw_df, team, price_in_tenths):
+    """Assemble the canonical 13-column players frame.
+
+    Shared by both fetch modes so the column order, casts and
+    categorical work live in one place. `team` is the already-resolved
+    canonical team Series; price_in_tenths says whether now_cost is
+    always tenths of a million (live API) or only when > 100 (the
+    vaastav archive mixes both encodings across seasons).
+    """
+    price = raw_df['now_cost'].fillna(0).astype('float64')
+    if price_in_tenths:
+        price = price / 10.0
+    else:
+        price = price.where(price <= 100, price / 10.0)
+
+    def int_col(name):
+        return raw_df[name].fillna(0).astype('int64')
+
+    out = pd.DataFrame({
+        'player_name': raw_df['web_name'].fillna(''),
+        'full_name': (raw_df['first_name'].fillna('').astype(str)
+                      .str.cat(raw_df['second_name'].fillna('').astype(str), sep=' ')
+                      .str.strip()),
+        'team': team,
+        'position': raw_df['element_type'].map(POSITION_MAP).fillna('UNK'),
+        'goals': int_col('goals_scored'),
+        'assists': int_col('assists'),
+        'clean_sheets': int_col('clean_sheets'),
+        'minutes': int_col('minutes'),
+        'yellow_cards': int_col('yellow_cards'),
+        'red_cards': int_col('red_cards'),
+        'total_points': int_col('total_points'),
+        'price': price,
+        'bonus': int_col('bonus'),
+    })
+    # Low-cardinality text columns become categoricals: one int8 code
+    # per row instead of a Python string object. to_csv still writes
+    # the plain labels.
+    out['position'] = pd.Categorical(out['position'],
+                                     categories=POSITION_CATEGORIES)
+    out['team'] = out['team'].astype('category')
+    return out
+
+
+def _build_fixtures_df(raw_df, home_team, away_team):
+    """Assemble the canonical fixtures frame from finished matches."""
+    out = pd.DataFrame({
+        'match_date': raw_df['kickoff_time'].fillna('').astype(str).str[:10],
+        'home_team': home_team,
+        'away_team': away_team,
+        'home_score': pd.to_numeric(raw_df['team_h_score'],
+                                    errors='coerce').fillna(0).astype('int32'),
+        'away_score': pd.to_numeric(raw_df['team_a_score'],
+                                    errors='coerce').fillna(0).astype('int32'),
+    })
+    out['home_team'] = out['home_team'].astype('category')
+    out['away_team'] = out['away_team'].astype('category')
+    return out
+
+
 def fetch_historical():
     """Fetch from vaastav GitHub archive for completed seasons."""
-    season = CURRENT_SEASON
-    base = FPL_GITHUB_BASE.format(season=season)
-    print(f"Fetching FPL data for season {season} (historical mode)...")
+    base = CURRENT_FPL_BASE
+    print(f"Fetching FPL data for season {CURRENT_SEASON} (historical mode)...")
 
     # Players
     resp = fetch_url(f"{base}/cleaned_players.csv", "cleaned_players.csv")
@@ -80,7 +310,7 @@ def fetch_historical():
         return
     time.sleep(REQUEST_DELAY)
 
-    players_df = pd.read_csv(pd.io.common.StringIO(resp.text))
+    players_df = read_remote_csv(resp, PLAYER_USECOLS, PLAYER_DTYPES)
     print(f"  Downloaded cleaned_players.csv: {len(players_df)} players")
 
     # Teams
@@ -90,59 +320,34 @@ def fetch_historical():
         return
     time.sleep(REQUEST_DELAY)
 
-    teams_df = pd.read_csv(pd.io.common.StringIO(resp.text))
+    teams_df = read_remote_csv(resp, TEAM_USECOLS, TEAM_DTYPES)
     print(f"  Downloaded teams.csv: {len(teams_df)} teams")
 
-    # Build team lookup
-    team_lookup = dict(zip(teams_df['id'], teams_df['name']))
-
-    # Process players
-    result = []
-    for _, row in players_df.iterrows():
-        team_id = row.get('team', 0)
-        team_name = team_lookup.get(team_id, str(team_id))
-        team_name = normalize_team(team_name)
-
-        pos_id = row.get('element_type', 0)
-        position = POSITION_MAP.get(pos_id, 'UNK')
-
-        price = row.get('now_cost', 0)
-        if price > 100:
-            price = price / 10.0
-
-        result.append({
-            'player_name': row.get('web_name', ''),
-            'full_name': f"{row.get('first_name', '')} {row.get('second_name', '')}".strip(),
-            'team': team_name,
-            'position': position,
-            'goals': int(row.get('goals_scored', 0)),
-            'assists': int(row.get('assists', 0)),
-            'clean_sheets': int(row.get('clean_sheets', 0)),
-            'minutes': int(row.get('minutes', 0)),
-            'yellow_cards': int(row.get('yellow_cards', 0)),
-            'red_cards': int(row.get('red_cards', 0)),
-            'total_points': int(row.get('total_points', 0)),
-            'price': round(float(price), 1),
-            'bonus': int(row.get('bonus', 0)),
-        })
-
-    output_df = pd.DataFrame(result)
+    # Build team lookup, composed with the canonical name map so one
+    # .map() call resolves team id straight to the canonical team name
+    canonical_lookup = resolve_team_ids(dict(zip(teams_df['id'], teams_df['name'])))
+    id_table = team_id_table(canonical_lookup)
+
+    # Process players -- shared column-op builder, archive price encoding
+    output_df = _build_players_df(
+        players_df, resolve_ids(players_df['team'], id_table),
+        price_in_tenths=False)
 
     # Team name mapping summary
     mapped = sum(1 for t in output_df['team'].unique() if t in FPL_NAME_MAP.values())
     print(f"  Team name mapping: {mapped} canonical names applied")
 
     output_path = os.path.join(CLEAN_DIR, 'players.csv')
-    output_df.to_csv(output_path, index=False)
+    save_frame(output_df, output_path)
     print(f"\nSaved: {output_path} ({len(output_df)} rows, {len(output_df.columns)} columns)")
 
     # Fixtures detailed (simplified -- not all seasons have granular event data)
-    build_fixtures_from_github(base, team_lookup)
+    build_fixtures_from_github(base, id_table)
 
     print("FPL data fetch complete.")
 
 
-def build_fixtures_from_github(base, team_lookup):
+def build_fixtures_from_github(base, id_table):
     """Build fixtures_detailed.csv from gameweek files if available."""
     # The vaastav repo structure varies. Try to build a basic fixture list.
     resp = fetch_url(f"{base}/fixtures.csv", "fixtures.csv")
@@ -151,32 +356,20 @@ def build_fixtures_from_github(base, team_lookup):
         return
     time.sleep(REQUEST_DELAY)
 
-    fixtures_df = pd.read_csv(pd.io.common.StringIO(resp.text))
+    fixtures_df = read_remote_csv(resp, FIXTURE_USECOLS, FIXTURE_DTYPES)
     print(f"  Downloaded fixtures.csv: {len(fixtures_df)} rows")
 
     # Filter to finished matches
     if 'finished' in fixtures_df.columns:
         fixtures_df = fixtures_df[fixtures_df['finished'] == True]
 
-    rows = []
-    for _, row in fixtures_df.iterrows():
-        home_id = row.get('team_h', 0)
-        away_id = row.get('team_a', 0)
-        home_team = normalize_team(team_lookup.get(home_id, str(home_id)))
-        away_team = normalize_team(team_lookup.get(away_id, str(away_id)))
-
-        rows.append({
-            'match_date': str(row.get('kickoff_time', ''))[:10],
-            'home_team': home_team,
-            'away_team': away_team,
-            'home_score': int(row.get('team_h_score', 0)) if pd.notna(row.get('team_h_score')) else 0,
-            'away_score': int(row.get('team_a_score', 0)) if pd.notna(row.get('team_a_score')) else 0,
-        })
-
-    if rows:
-        output_df = pd.DataFrame(rows)
+    output_df = _build_fixtures_df(fixtures_df,
+                                   resolve_ids(fixtures_df['team_h'], id_table),
+                                   resolve_ids(fixtures_df['team_a'], id_table))
+
+    if len(output_df):
         output_path = os.path.join(CLEAN_DIR, 'fixtures_detailed.csv')
-        output_df.to_csv(output_path, index=False)
+        save_frame(output_df, output_path)
         print(f"  Saved: {output_path} ({len(output_df)} rows)")
 
 
@@ -194,63 +387,60 @@ def fetch_live():
     elements = data.get('elements', [])
     teams = data.get('teams', [])
 
-    team_lookup = {t['id']: t['name'] for t in teams}
-
-    result = []
-    for p in elements:
-        team_name = normalize_team(team_lookup.get(p.get('team', 0), 'Unknown'))
-        pos = POSITION_MAP.get(p.get('element_type', 0), 'UNK')
-        price = p.get('now_cost', 0) / 10.0
-
-        result.append({
-            'player_name': p.get('web_name', ''),
-            'full_name': f"{p.get('first_name', '')} {p.get('second_name', '')}".strip(),
-            'team': team_name,
-            'position': pos,
-            'goals': int(p.get('goals_scored', 0)),
-            'assists': int(p.get('assists', 0)),
-            'clean_sheets': int(p.get('clean_sheets', 0)),
-            'minutes': int(p.get('minutes', 0)),
-            'yellow_cards': int(p.get('yellow_cards', 0)),
-            'red_cards': int(p.get('red_cards', 0)),
-            'total_points': int(p.get('total_points', 0)),
-            'price': round(price, 1),
-            'bonus': int(p.get('bonus', 0)),
-        })
-
-    output_df = pd.DataFrame(result)
+    canonical_lookup = resolve_team_ids({t['id']: t['name'] for t in teams})
+
+    # The live API uses the same field names as the archive CSVs, so one
+    # DataFrame over the raw elements feeds the shared builder directly
+    ep = pd.DataFrame(elements)
+    output_df = _build_players_df(
+        ep, ep['team'].map(canonical_lookup).fillna('Unknown'),
+        price_in_tenths=True)
     output_path = os.path.join(CLEAN_DIR, 'players.csv')
-    output_df.to_csv(output_path, index=False)
+    save_frame(output_df, output_path)
     print(f"\nSaved: {output_path} ({len(output_df)} rows, {len(output_df.columns)} columns)")
 
-    # Fixtures
+    # Fixtures -- the bootstrap payload already tells us the last finished
+    # gameweek, so skip the whole fixtures round trip (and its ~200KB JSON
+    # parse) when no new matches have finished since the previous run
+    last_gw = max((e.get('id', 0) for e in data.get('events', [])
+                   if e.get('finished')), default=0)
+    gw_path = os.path.join(CLEAN_DIR, '.last_gw.json')
+    fx_path = os.path.join(CLEAN_DIR, 'fixtures_detailed.csv')
+    try:
+        with open(gw_path, encoding='utf-8') as f:
+            stored_gw = json.load(f).get('last_finished_gw')
+    except (OSError, ValueError):
+        stored_gw = None
+    if stored_gw == last_gw and os.path.exists(fx_path):
+        print(f"  Gameweek {last_gw} still the last finished -- "
+              f"fixtures_detailed.csv is current")
+        print("FPL data fetch complete.")
+        return
+
     resp = fetch_url(f"{FPL_LIVE_API}/fixtures/", "fixtures")
     if resp:
         time.sleep(REQUEST_DELAY)
         fixtures = resp.json()
         finished = [f for f in fixtures if f.get('finished')]
-        rows = []
-        for f in finished:
-            rows.append({
-                'match_date': str(f.get('kickoff_time', ''))[:10],
-                'home_team': normalize_team(team_lookup.get(f.get('team_h', 0), 'Unknown')),
-                'away_team': normalize_team(team_lookup.get(f.get('team_a', 0), 'Unknown')),
-                'home_score': int(f.get('team_h_score', 0) or 0),
-                'away_score': int(f.get('team_a_score', 0) or 0),
-            })
-        if rows:
-            fx_df = pd.DataFrame(rows)
-            fx_path = os.path.join(CLEAN_DIR, 'fixtures_detailed.csv')
-            fx_df.to_csv(fx_path, index=False)
+        if finished:
+            fx = pd.DataFrame(finished)
+            fx_df = _build_fixtures_df(
+                fx, fx['team_h'].map(canonical_lookup).fillna('Unknown'),
+                fx['team_a'].map(canonical_lookup).fillna('Unknown'))
+            save_frame(fx_df, fx_path)
             print(f"  Saved: {fx_path} ({len(fx_df)} rows)")
 
+        # Remember which gameweek this snapshot covers only after a
+        # successful fetch, so a failed run retries next time
+        with open(gw_path, 'w', encoding='utf-8') as f:
+            json.dump({'last_finished_gw': last_gw}, f)
+
     print("FPL data fetch complete.")
 
 
 def main():
     try:
-        season_info = ACTIVE_SEASONS[CURRENT_SEASON]
-        mode = season_info.get("fpl_mode", "historical")
+        mode = CURRENT_SEASON_INFO.get("fpl_mode", "historical")
 
         if mode == "live":
             fetch_live()
@@ -112,3 +112,11 @@ UNDERSTAT_NAME_MAP = {
     "Leeds United": "Leeds United",
     "Leeds": "Leeds United",
 }
+
+# -- DERIVED CONSTANTS -----------------------------------------------------
+# Resolved once at import so scripts reference the current season's info
+# directly instead of repeating dict lookups and .format() calls. A typo
+# in the season tables fails here, at import, rather than mid-fetch.
+CURRENT_SEASON_INFO = ACTIVE_SEASONS[CURRENT_SEASON]
+CURRENT_FPL_BASE = FPL_GITHUB_BASE.format(season=CURRENT_SEASON)
+CURRENT_UNDERSTAT_YEAR = CURRENT_SEASON_INFO["understat"]